@@ -1,18 +1,24 @@
 from dataclasses import dataclass
-from typing import Dict, Union
+from typing import Dict, Tuple
 
 import h5py
 import numpy as np
 from numpy.typing import ArrayLike
 
-# Recursive type alias for nested dictionary of numpy arrays
-BeamData = Dict[str, Union[np.ndarray, "BeamData"]]
+# Raw data chunk caches (size in bytes, number of hash slots, ideally a
+# prime) for datasets that uncached Beams slice shot by shot. HDF5
+# allocates a chunk cache for every open chunked dataset, so other
+# datasets keep the (small) default cache.
+DATASET_CHUNK_CACHES: Dict[str, Tuple[int, int]] = {
+    "rxwaveform": (32 * 1024**2, 4001),
+}
 
 
 @dataclass
 class Beam:
     """
-    Loads a beam h5py.Group from an L1B and L2A file and caches it in memory.
+    Loads a beam h5py.Group from an L1B and L2A file and caches the
+    datasets extracted from it in memory.
 
     Attributes
     ----------
@@ -23,7 +29,7 @@ class Beam:
         The name of the beam.
 
     cache: bool
-        Whether to cache the beam data in memory.
+        Whether to cache extracted datasets in memory.
     """
 
     file: h5py.File
@@ -34,38 +40,41 @@ class Beam:
         self._path = self.file.filename
         self._group = self.file[self.beam]
 
-        # Load beam into memory if caching is enabled;
-        # otherwise, access data directly from h5py.Group
-        if self.cache:
-            self.data = Beam._load_group(self._group)
-        else:
-            self.data = self._group
-
-    @staticmethod
-    def _load_group(group: h5py.Group) -> BeamData:
-        """Recursively loads nested group data into a dictionary."""
-        data = {}
-        for key in group:
-            if isinstance(group[key], h5py.Group):
-                # Recursively load sub-group into nested dictionary
-                data[key] = Beam._load_group(group[key])
-            elif isinstance(group[key], h5py.Dataset):
-                # Load dataset into dictionary as numpy array
-                data[key] = group[key][()]
-            else:
-                raise TypeError(
-                    f"Expected group or dataset, got {type(group[key])}"
-                )
-        return data
+        # Datasets already resolved by extract_dataset, keyed by path.
+        # If caching is enabled, datasets are loaded into memory as they
+        # are first extracted, so that only the datasets in use are read;
+        # otherwise, data is accessed directly from the h5py.Group.
+        self._datasets: Dict[str, ArrayLike] = {}
+
+        # Cached datasets stacked into columns by extract_values, keyed by
+        # their tuple of paths
+        self._stacked: Dict[Tuple[str, ...], np.ndarray] = {}
 
     def extract_dataset(self, path: str) -> ArrayLike:
         """Extracts a full dataset from the beam data at the given path."""
-        keys = path.split("/")
-        data = self.data
-        for key in keys:
+        # Datasets are looked up and validated once, then reused
+        dataset = self._datasets.get(path)
+        if dataset is None:
+            dataset = self._resolve_dataset(path)
+            self._datasets[path] = dataset
+        return dataset
+
+    def _resolve_dataset(self, path: str) -> ArrayLike:
+        """Finds the dataset at the given path, checks its type, and loads
+        it into memory if caching is enabled."""
+        *group_keys, name = path.split("/")
+        data = self._group
+        for key in group_keys:
             data = data[key]
-        if not isinstance(data, (np.ndarray, h5py.Dataset)):
-            raise TypeError(f"Expected ArrayLike, got {type(data)}")
+        chunk_cache = DATASET_CHUNK_CACHES.get(path)
+        if chunk_cache is not None and not self.cache:
+            data = _open_with_chunk_cache(data, name, *chunk_cache)
+        else:
+            data = data[name]
+        if not isinstance(data, h5py.Dataset):
+            raise TypeError(f"Expected h5py.Dataset, got {type(data)}")
+        if self.cache:
+            data = data[()]
         return data
 
     def extract_value(self, path: str, index: int) -> float:
@@ -73,6 +82,26 @@ class Beam:
         data = self.extract_dataset(path)
         return data[index]
 
+    def extract_values(
+        self, paths: Tuple[str, ...], index: int
+    ) -> Tuple[float, ...]:
+        """Extracts the values at index from several datasets of the same
+        length, in the order of paths.
+
+        For cached beams the datasets are stacked into the columns of a
+        single array on first use, so that each call reads one row instead
+        of looking up every dataset."""
+        if not self.cache:
+            return tuple(self.extract_value(path, index) for path in paths)
+
+        stacked = self._stacked.get(paths)
+        if stacked is None:
+            stacked = np.column_stack(
+                [self.extract_dataset(path) for path in paths]
+            )
+            self._stacked[paths] = stacked
+        return tuple(stacked[index])
+
     def get_beam_name(self) -> str:
         """Returns the name of the beam."""
         return self.beam
@@ -93,3 +122,13 @@ class Beam:
             f"Beam(file={self._path}, beam={self.beam}, "
             f"cache={self.cache})"
         )
+
+
+def _open_with_chunk_cache(
+    group: h5py.Group, name: str, rdcc_nbytes: int, rdcc_nslots: int
+) -> h5py.Dataset:
+    # Open a dataset with its own raw data chunk cache rather than the
+    # file's, via a dataset access property list
+    dapl = h5py.h5p.create(h5py.h5p.DATASET_ACCESS)
+    dapl.set_chunk_cache(rdcc_nslots, rdcc_nbytes, 0.75)
+    return h5py.Dataset(h5py.h5d.open(group.id, name.encode(), dapl=dapl))
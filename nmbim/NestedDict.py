@@ -1,4 +1,18 @@
-from typing import Any, Dict, Set
+from functools import lru_cache
+from typing import Any, Dict, Set, Tuple
+
+
+@lru_cache(maxsize=128)
+def _split_path(path: str) -> Tuple[str, ...]:
+    """Split a '/' separated path into its keys.
+
+    Data is accessed with a small, fixed set of paths, so the split keys
+    are cached rather than recomputed on every access.
+    """
+    keys = tuple(path.strip("/").split("/"))
+    if not keys or any(not key for key in keys):
+        raise ValueError("Invalid path provided.")
+    return keys
 
 
 class NestedDict:
@@ -43,22 +57,39 @@ class NestedDict:
         KeyError
             If the path does not exist in the nested dictionary.
         """
-        keys = path.strip("/").split("/")
+        return self.get_data_by_keys(_split_path(path))
 
-        if not keys or any(not key for key in keys):
-            raise ValueError("Invalid path provided.")
+    def get_data_by_keys(self, keys: Tuple[str, ...]) -> Any:
+        """Retrieve data from the nested dictionary with a path that has
+        already been split into keys (see split_path).
 
+        Raises
+        ------
+        KeyError
+            If the path does not exist in the nested dictionary.
+        """
         data = self._data
         for key in keys:
             if isinstance(data, dict) and key in data:
                 data = data[key]
             else:
                 raise KeyError(
-                    f"Path '{path}' not found in NestedDict."
+                    f"Path '{'/'.join(keys)}' not found in NestedDict."
                     f" Available paths: {sorted(self._paths)}"
                 )
         return data
 
+    @staticmethod
+    def split_path(path: str) -> Tuple[str, ...]:
+        """Split a '/' separated path into keys for get_data_by_keys.
+
+        Raises
+        ------
+        ValueError
+            If the path is invalid.
+        """
+        return _split_path(path)
+
     def has_path(self, path: str) -> bool:
         """Check if the nested dictionary contains the specified path.
         Invalid paths are considered not to exist.
@@ -103,9 +134,7 @@ class NestedDict:
                 f"Overwriting is not allowed."
             )
 
-        keys = normalized_path.split("/")
-        if not keys or any(not key for key in keys):
-            raise ValueError("Invalid path provided.")
+        keys = _split_path(normalized_path)
 
         # Traverse the nested dictionary to the correct location
         current = self._data
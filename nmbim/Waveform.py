@@ -1,5 +1,5 @@
 from copy import deepcopy
-from typing import Any, Dict, Literal, Optional, Set
+from typing import Any, Dict, Literal, Mapping, Optional, Set, Tuple
 from datetime import datetime, timedelta
 
 import h5py
@@ -9,6 +9,47 @@ from shapely.geometry import Point
 from nmbim.Beam import Beam
 from nmbim.NestedDict import NestedDict
 
+# Reference epoch for GPS time, from which the GEDI epoch is offset
+GPS_EPOCH: datetime = datetime(1980, 1, 6)
+
+# Per-shot values that are read directly from beam datasets, given as
+# Waveform data paths mapped to dataset paths within the L1B or L2A beam
+L1B_SHOT_FIELDS: Dict[str, str] = {
+    "raw/mean_noise": "noise_mean_corrected",
+    "raw/elev/top": "geolocation/elevation_bin0",
+    "raw/elev/bottom": "geolocation/elevation_lastbin",
+}
+
+# Footprint coordinates in the L1B beam, which are read together
+L1B_COORD_FIELDS: Dict[str, str] = {
+    "metadata/coords/lat": "geolocation/latitude_bin0",
+    "metadata/coords/lon": "geolocation/longitude_bin0",
+}
+
+L2A_SHOT_FIELDS: Dict[str, str] = {
+    "metadata/flags/quality": "quality_flag",
+    "metadata/flags/surface": "surface_flag",
+    "metadata/modes/num_modes": "num_detectedmodes",
+    "metadata/landcover/modis_nonvegetated": (
+        "land_cover_data/modis_nonvegetated"
+    ),
+    "metadata/landcover/modis_treecover": "land_cover_data/modis_treecover",
+    "metadata/landcover/landsat_treecover": (
+        "land_cover_data/landsat_treecover"
+    ),
+    "raw/rh": "rh",
+    "raw/elev/ground": "elev_lowestmode",
+}
+
+# Further L1B datasets used to timestamp each shot and locate its samples
+# within the beam's rxwaveform dataset
+L1B_WAVEFORM_DATASETS = (
+    "ancillary/master_time_epoch",
+    "geolocation/delta_time",
+    "rx_sample_start_index",
+    "rx_sample_count",
+)
+
 
 class Waveform:
     """Stores raw and processed waveform data for one GEDI footprint.
@@ -35,11 +76,17 @@ class Waveform:
         l1b: Optional[h5py.File] = None,
         l2a: Optional[h5py.File] = None,
         immutable: bool = True,
+        shot_index: Optional[int] = None,
     ) -> None:
         """Initializes the Waveform object. In addition to a shot number,
         requires either two Beam objects or two h5py file objects.
 
         If immutable is True, data will be deepcopied when retrieved.
+
+        If the shot's index within the beams is already known (e.g.
+        because the caller has verified that the L1B and L2A shot
+        numbers match), it can be supplied as shot_index to skip
+        looking it up in both files.
         """
         signature = Waveform._validate_signature(init_args=locals().copy())
 
@@ -92,44 +139,48 @@ class Waveform:
             self.l2a_beam = Beam(file=l2a, beam=beam_name, cache=False)
 
         # Store shot index
-        l1b_index = self.l1b_beam.where_shot(shot_number)
-        l2a_index = self.l2a_beam.where_shot(shot_number)
-        if l1b_index == l2a_index:
+        if shot_index is None:
+            l1b_index = self.l1b_beam.where_shot(shot_number)
+            l2a_index = self.l2a_beam.where_shot(shot_number)
+            if l1b_index != l2a_index:
+                raise ValueError(
+                    f"File mismatch: L1B shot index {l1b_index} != L2A "
+                    f"shot index {l2a_index}"
+                )
             shot_index = l1b_index
-            self.save_data(data=shot_index, path="metadata/shot_index")
-        else:
-            raise ValueError(
-                f"File mismatch: L1B shot index {l1b_index} != L2A "
-                f"shot index {l2a_index}"
-            )
-
-        # Store coordinates
-        lat = self.l1b_beam.extract_value(
-            "geolocation/latitude_bin0", shot_index
-        )
+        self.save_data(data=shot_index, path="metadata/shot_index")
 
-        lon = self.l1b_beam.extract_value(
-            "geolocation/longitude_bin0", shot_index
-        )
-
-        self.save_data(
-            data={"lat": lat, "lon": lon},
-            path="metadata/coords",
+        # Store per-shot values read directly from beam datasets
+        coords = self.l1b_beam.extract_values(
+            tuple(L1B_COORD_FIELDS.values()), shot_index
         )
+        for path, value in zip(L1B_COORD_FIELDS, coords):
+            self.save_data(data=value, path=path)
+        for path, dataset in L1B_SHOT_FIELDS.items():
+            self.save_data(
+                data=self.l1b_beam.extract_value(dataset, shot_index),
+                path=path,
+            )
+        for path, dataset in L2A_SHOT_FIELDS.items():
+            self.save_data(
+                data=self.l2a_beam.extract_value(dataset, shot_index),
+                path=path,
+            )
 
         # Store point geometry
+        lon = self._data.get_data("metadata/coords/lon")
+        lat = self._data.get_data("metadata/coords/lat")
         self.save_data(
             data=Point(lon, lat),
             path="metadata/point_geom",
         )
-        
+
         # Extract and store GPS time for the waveform
-        # Define the GPS epoch and calculate the GEDI epoch
-        gps_epoch: datetime = datetime(1980, 1, 6)
+        # Calculate the GEDI epoch from the GPS epoch
         gedi_epoch_offset: int = self.l1b_beam.extract_value(
             "ancillary/master_time_epoch", 0
         )
-        gedi_epoch: datetime = gps_epoch + timedelta(seconds=gedi_epoch_offset)
+        gedi_epoch: datetime = GPS_EPOCH + timedelta(seconds=gedi_epoch_offset)
 
         # Calculate the waveform time
         wf_timedelta: int = self.l1b_beam.extract_value(
@@ -138,38 +189,6 @@ class Waveform:
         wf_time: datetime = gedi_epoch + timedelta(seconds=wf_timedelta)
         self.save_data(data=wf_time, path="metadata/time")
 
-        # Store quality flags
-        qual_flag = self.l2a_beam.extract_value("quality_flag", shot_index)
-        surf_flag = self.l2a_beam.extract_value("surface_flag", shot_index)
-        flag_dict = {"quality": qual_flag, "surface": surf_flag}
-        self.save_data(data=flag_dict, path="metadata/flags")
-
-        # Store number of detected modes
-        self.save_data(
-            data={
-                "num_modes": self.l2a_beam.extract_value(
-                    "num_detectedmodes", shot_index
-                )
-            },
-            path="metadata/modes",
-        )
-
-        # Store land cover data
-        self.save_data(
-            data={
-                "modis_nonvegetated": self.l2a_beam.extract_value(
-                    "land_cover_data/modis_nonvegetated", shot_index
-                ),
-                "modis_treecover": self.l2a_beam.extract_value(
-                    "land_cover_data/modis_treecover", shot_index
-                ),
-                "landsat_treecover": self.l2a_beam.extract_value(
-                    "land_cover_data/landsat_treecover", shot_index
-                ),
-            },
-            path="metadata/landcover",
-        )
-
         # Store raw waveform data from L1B beam by subsetting the waveform
         # (subtract 1 from start index to convert to 0-based indexing)
         all_wfs: ArrayLike = self.l1b_beam.extract_dataset("rxwaveform")
@@ -183,34 +202,66 @@ class Waveform:
         wf = all_wfs[wf_start : wf_start + wf_len]
         self.save_data(data=wf, path="raw/wf")
 
-        # Store mean noise value
-        self.save_data(
-            data=self.l1b_beam.extract_value(
-                "noise_mean_corrected", shot_index
-            ),
-            path="raw/mean_noise",
+    @classmethod
+    def from_beam_arrays(
+        cls,
+        shot_number: int,
+        shot_index: int,
+        beam_name: str,
+        l1b_arrays: Mapping[str, ArrayLike],
+        l2a_arrays: Mapping[str, ArrayLike],
+        l1b_path: str,
+        l2a_path: str,
+        immutable: bool = True,
+    ) -> "Waveform":
+        """Creates a Waveform from datasets already extracted from its
+        L1B and L2A beams, for fast batch construction.
+
+        l1b_arrays and l2a_arrays map dataset paths within the beams to
+        the datasets (arrays or h5py datasets), including rxwaveform.
+        Unlike the constructor, no shot lookups or beam consistency
+        checks are made, so the caller must pass matching beams and the
+        shot's index within them. The Waveform keeps no reference to the beams.
+        """
+        wf = cls.__new__(cls)
+        wf.immutable = immutable
+        wf._data = NestedDict()
+        data = wf._data
+
+        # Paths are known to be valid, so store data without validation
+        data.save_data(shot_number, "metadata/shot_number")
+        data.save_data(beam_name, "metadata/beam")
+        data.save_data(l1b_path, "metadata/l1b_path")
+        data.save_data(l2a_path, "metadata/l2a_path")
+        data.save_data(shot_index, "metadata/shot_index")
+
+        for arrays, fields in (
+            (l1b_arrays, L1B_COORD_FIELDS),
+            (l1b_arrays, L1B_SHOT_FIELDS),
+            (l2a_arrays, L2A_SHOT_FIELDS),
+        ):
+            for path, dataset in fields.items():
+                data.save_data(arrays[dataset][shot_index], path)
+
+        lon = data.get_data("metadata/coords/lon")
+        lat = data.get_data("metadata/coords/lat")
+        data.save_data(Point(lon, lat), "metadata/point_geom")
+
+        gedi_epoch = GPS_EPOCH + timedelta(
+            seconds=l1b_arrays["ancillary/master_time_epoch"][0]
         )
-
-        # Store relative height
-        self.save_data(
-            data=self.l2a_beam.extract_value("rh", shot_index), path="raw/rh"
+        wf_time = gedi_epoch + timedelta(
+            seconds=l1b_arrays["geolocation/delta_time"][shot_index]
         )
+        data.save_data(wf_time, "metadata/time")
 
-        # Store elevation
-        self.save_data(
-            data={
-                "top": self.l1b_beam.extract_value(
-                    "geolocation/elevation_bin0", shot_index
-                ),
-                "bottom": self.l1b_beam.extract_value(
-                    "geolocation/elevation_lastbin", shot_index
-                ),
-                "ground": self.l2a_beam.extract_value(
-                    "elev_lowestmode", shot_index
-                ),
-            },
-            path="raw/elev",
+        # Subtract 1 from start index to convert to 0-based indexing
+        wf_start = l1b_arrays["rx_sample_start_index"][shot_index] - 1
+        wf_len = l1b_arrays["rx_sample_count"][shot_index]
+        data.save_data(
+            l1b_arrays["rxwaveform"][wf_start : wf_start + wf_len], "raw/wf"
         )
+        return wf
 
     @staticmethod
     def _validate_signature(
@@ -272,6 +323,14 @@ class Waveform:
             data = deepcopy(data)
         return data
 
+    def get_data_by_keys(self, keys: Tuple[str, ...]) -> Any:
+        """Returns the data stored at a path already split into keys with
+        NestedDict.split_path, for repeated access to the same path."""
+        data = self._data.get_data_by_keys(keys)
+        if self.immutable:
+            data = deepcopy(data)
+        return data
+
     def save_data(self, data: Any, path: str) -> None:
         """Saves data to the given path in the Waveform object. If a
         dictionary is passed, its keys will be saved as sub-entries
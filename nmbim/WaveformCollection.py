@@ -1,14 +1,49 @@
 import warnings
-from typing import Callable, List, Optional, Union
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Protocol, Tuple, Union
 
 import h5py
 import numpy as np
+from numpy.typing import ArrayLike
 
 from nmbim.Beam import Beam
-from nmbim.Waveform import Waveform
+from nmbim.Waveform import (
+    L1B_COORD_FIELDS,
+    L1B_SHOT_FIELDS,
+    L1B_WAVEFORM_DATASETS,
+    L2A_SHOT_FIELDS,
+    Waveform,
+)
+
+# Filters are usually closures, which only dill can send to other processes
+try:
+    import dill
+
+    MULTIPROCESSING_AVAILABLE = True
+except ImportError:
+    MULTIPROCESSING_AVAILABLE = False
 
 Filter = Callable[[Waveform], bool]
 
+# Approximate number of evenly spaced shot numbers compared between the
+# L1B and L2A files of a beam when a strict check is not requested
+SHOT_CHECK_SAMPLES = 1024
+
+
+class BulkFilter(Protocol):
+    """A filter that can also be evaluated for every shot in a beam at once.
+
+    In addition to being called on single Waveforms like any Filter, a
+    BulkFilter provides a mask method that evaluates the same condition
+    on whole beam datasets and returns a boolean array with one entry per
+    shot in the beam. WaveformCollection uses these masks to avoid
+    constructing Waveforms for shots that would be filtered out.
+    """
+
+    def __call__(self, wf: Waveform) -> bool: ...
+
+    def mask(self, l1b_beam: Beam, l2a_beam: Beam) -> np.ndarray: ...
+
 
 class WaveformCollection:
     """
@@ -19,6 +54,15 @@ class WaveformCollection:
     user-defined filters to include only waveforms that meet the specified
     criteria.
 
+    Besides the list of Waveforms, the collection offers a
+    structure-of-arrays view of their data: get_column returns the data
+    at one path for every waveform as a single array, and
+    get_ragged_column does the same for variable-length arrays such as
+    raw/wf. Columns for values read directly from the beams are loaded
+    with one read per dataset when the collection is constructed. With
+    cached beams, the raw waveforms of each beam's Waveforms are views
+    into one contiguous array of their samples.
+
     Attributes:
         l1b_path (Path): Path to the L1B HDF5 file.
         l2a_path (Path): Path to the L2A HDF5 file.
@@ -29,6 +73,16 @@ class WaveformCollection:
         add_waveform(wf: Waveform):
             Adds a waveform if it passes the filters.
 
+        save_bulk(path: str, values: ArrayLike):
+            Saves one value per waveform at path.
+
+        get_column(path: str) -> np.ndarray:
+            Returns the data at path for all waveforms as one array.
+
+        get_ragged_column(path: str) -> Tuple[np.ndarray, np.ndarray]:
+            Returns variable-length data at path for all waveforms as
+            concatenated values and offsets.
+
         __iter__():
             Returns an iterator over the waveforms.
     """
@@ -40,6 +94,8 @@ class WaveformCollection:
         filters: Union[Filter, List[Filter]] = None,
         cache_beams: bool = True,
         beams=None,
+        n_workers: int = 1,
+        strict_check: bool = False,
     ):
         """
         Initialize the WaveformCollection by loading waveform data from two HDF5 files.
@@ -52,12 +108,22 @@ class WaveformCollection:
             cache_beams (bool, optional): Whether to cache beam data in memory.
                 Defaults to True.
             beams (List[str], optional): List of beam names to process.
+            n_workers (int, optional): Number of beams to construct
+                concurrently, in separate processes if dill is available.
+                Defaults to 1 (serial construction).
+            strict_check (bool, optional): Whether to compare every L1B
+                and L2A shot number of each beam, rather than only the
+                number of shots and about SHOT_CHECK_SAMPLES evenly
+                spaced shot numbers. Defaults to False.
         """
 
         self.l1b_path = l1b.filename
         self.l2a_path = l2a.filename
 
         self.waveforms = []
+        self._by_shot: Dict[int, Waveform] = {}
+        self._columns: Dict[str, np.ndarray] = {}
+        self._ragged_columns: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
         self.cache_beams = cache_beams
         self.beams = beams
 
@@ -68,53 +134,222 @@ class WaveformCollection:
 
         self.filters = filters
 
+        # Filters that can be evaluated on whole beams are applied before
+        # Waveform construction; the rest are applied to each Waveform
+        self._bulk_filters: List[BulkFilter] = [
+            filt for filt in filters if hasattr(filt, "mask")
+        ]
+        self._waveform_filters: List[Filter] = [
+            filt for filt in filters if not hasattr(filt, "mask")
+        ]
+
         # If no beams are specified, process all beams
         if beams is None:
             beams: List[str] = [key for key in l1b.keys() if key != "METADATA"]
 
-        # Construct waveforms for each beam, caching a beam at a time
-        for beam_name in beams:
-            l1b_beam = Beam(file=l1b, beam=beam_name, cache=self.cache_beams)
-            l2a_beam = Beam(file=l2a, beam=beam_name, cache=self.cache_beams)
-
-            shot_numbers_l1b: ArrayLike = l1b_beam.extract_dataset(
-                "shot_number"
-            )
-            shot_numbers_l2a: ArrayLike = l2a_beam.extract_dataset(
-                "shot_number"
+        # Construct waveforms for each beam, caching a beam at a time.
+        # Beams are independent, so they can be built concurrently. Open
+        # h5py.File handles cannot be shared with other processes, so each
+        # worker process reopens the files by path; without dill to send
+        # the filters, concurrent construction falls back to threads.
+        build_args = (
+            self.cache_beams,
+            strict_check,
+            self._bulk_filters,
+            self._waveform_filters,
+        )
+        if n_workers > 1 and len(beams) > 1:
+            max_workers = min(n_workers, len(beams))
+            if MULTIPROCESSING_AVAILABLE:
+                pickled_args = dill.dumps(build_args)
+                with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                    beam_waveforms = list(
+                        executor.map(
+                            _build_beam_waveforms_from_paths,
+                            [self.l1b_path] * len(beams),
+                            [self.l2a_path] * len(beams),
+                            beams,
+                            [pickled_args] * len(beams),
+                        )
+                    )
+            else:
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    beam_waveforms = list(
+                        executor.map(
+                            lambda beam_name: self._build_beam_waveforms(
+                                l1b, l2a, beam_name, *build_args
+                            ),
+                            beams,
+                        )
+                    )
+        else:
+            beam_waveforms = (
+                self._build_beam_waveforms(l1b, l2a, beam_name, *build_args)
+                for beam_name in beams
             )
 
-            # Check that shot numbers match between files
-            if not np.array_equal(shot_numbers_l1b, shot_numbers_l2a):
-                raise ValueError(
-                    f"Shot numbers don't match between {input_l1b}"
-                    f"and {input_l2a}"
+        all_beam_columns = []
+        for new_wfs, beam_columns in beam_waveforms:
+            for new_wf in new_wfs:
+                self.add_waveform(new_wf)
+            all_beam_columns.append(beam_columns)
+
+            if len(self) == 0:
+                warnings.warn(
+                    f"No waveforms were added to the collection "
+                    f"for beam(s) {self.beams}. Perhaps the filters "
+                    f"are too restrictive?"
                 )
 
-            # Check that both files have the same number of shots
-            if len(shot_numbers_l1b) != len(shot_numbers_l2a):
-                raise ValueError(
-                    f"{input_l1b} has {len(shot_numbers_l1b)} shots,"
-                    f"but {input_l2a} has {len(shot_numbers_l2a)} shots."
+        # Join the per-beam columns in the same order as the waveforms
+        if all_beam_columns:
+            for path in all_beam_columns[0]:
+                column = np.concatenate(
+                    [beam_columns[path] for beam_columns in all_beam_columns]
                 )
+                column.setflags(write=False)
+                self._columns[path] = column
 
-            shot_numbers = shot_numbers_l1b
+    @staticmethod
+    def open_files(
+        l1b_path: str, l2a_path: str
+    ) -> Tuple[h5py.File, h5py.File]:
+        """Open L1B and L2A files for reading waveforms, with the latest
+        file format library version.
 
-            # Create the Waveforms for this beam
-            waveform_args = {"l1b_beam": l1b_beam, "l2a_beam": l2a_beam}
+        The files keep h5py's default raw data chunk cache, since HDF5
+        allocates one for every open chunked dataset. Uncached Beams
+        give rxwaveform, which they slice shot by shot, a larger cache of
+        its own (see nmbim.Beam.DATASET_CHUNK_CACHES).
 
-            for shot_number in shot_numbers:
-                waveform_args["shot_number"] = shot_number
-                new_wf = Waveform(**waveform_args)
-                if self.filter_waveform(new_wf):
-                    self.add_waveform(new_wf)
+        Returns:
+            Tuple[h5py.File, h5py.File]: The open L1B and L2A files.
+        """
+        file_args = {"mode": "r", "libver": "latest"}
+        l1b = h5py.File(l1b_path, **file_args)
+        try:
+            l2a = h5py.File(l2a_path, **file_args)
+        except Exception:
+            l1b.close()
+            raise
+        return l1b, l2a
 
-            if len(self) == 0:
-                warnings.warn(
-                    f"No waveforms were added to the collection "
-                    f"for beam(s) {self.beams}. Perhaps the filters "
-                    f"are too restrictive?"
+    @staticmethod
+    def _build_beam_waveforms(
+        l1b: h5py.File,
+        l2a: h5py.File,
+        beam_name: str,
+        cache_beams: bool,
+        strict_check: bool,
+        bulk_filters: List[BulkFilter],
+        waveform_filters: List[Filter],
+    ) -> Tuple[List[Waveform], Dict[str, np.ndarray]]:
+        """Construct the filtered Waveforms for a single beam, along with
+        columns of their per-shot beam values."""
+        l1b_beam = Beam(file=l1b, beam=beam_name, cache=cache_beams)
+        l2a_beam = Beam(file=l2a, beam=beam_name, cache=cache_beams)
+
+        shot_numbers_l1b: ArrayLike = l1b_beam.extract_dataset("shot_number")
+        shot_numbers_l2a: ArrayLike = l2a_beam.extract_dataset("shot_number")
+
+        # Shots are paired between files by index, so check that shot
+        # numbers match. GEDI products share the shot numbering of a
+        # granule, so unless a strict check is requested, matching shot
+        # counts and an evenly spaced sample of shot numbers (including
+        # the last) are enough; any misalignment spanning more than the
+        # sample spacing is caught.
+        shot_numbers = shot_numbers_l1b[()]
+        if strict_check:
+            shots_match = np.array_equal(shot_numbers, shot_numbers_l2a)
+        else:
+            shots_match = shot_numbers.shape == shot_numbers_l2a.shape
+            if shots_match and len(shot_numbers) > 0:
+                step = max(1, len(shot_numbers) // SHOT_CHECK_SAMPLES)
+                shots_match = (
+                    np.array_equal(
+                        shot_numbers[::step], shot_numbers_l2a[::step]
+                    )
+                    and shot_numbers[-1] == shot_numbers_l2a[-1]
                 )
+        if not shots_match:
+            raise ValueError(
+                f"Shot numbers for beam {beam_name} don't match between "
+                f"{l1b.filename} ({len(shot_numbers_l1b)} shots) and "
+                f"{l2a.filename} ({len(shot_numbers_l2a)} shots)"
+            )
+
+        # Evaluate bulk filters on the whole beam, so that Waveforms are
+        # only constructed for shots that pass them
+        keep = np.ones(len(shot_numbers), dtype=bool)
+        for filt in bulk_filters:
+            keep &= filt.mask(l1b_beam, l2a_beam)
+
+        # Read the per-shot datasets each Waveform is built from in full,
+        # once per beam, even if the beams are not cached; the samples
+        # for each shot are only sliced out of rxwaveform. Since shot
+        # numbers match, a shot's index is the same in both files and
+        # need not be looked up again for each Waveform.
+        l1b_arrays = {
+            dataset: l1b_beam.extract_dataset(dataset)[()]
+            for dataset in (
+                *L1B_COORD_FIELDS.values(),
+                *L1B_SHOT_FIELDS.values(),
+                *L1B_WAVEFORM_DATASETS,
+            )
+        }
+        candidates = np.flatnonzero(keep)
+
+        # For cached beams, pack the samples of the shots that passed the
+        # bulk filters into one contiguous array that their Waveforms
+        # share, rather than keeping the beam's full rxwaveform in memory
+        rxwaveform = l1b_beam.extract_dataset("rxwaveform")
+        if isinstance(rxwaveform, np.ndarray):
+            rxwaveform, start_index = _pack_samples(
+                rxwaveform,
+                l1b_arrays["rx_sample_start_index"],
+                l1b_arrays["rx_sample_count"],
+                candidates,
+            )
+            l1b_arrays["rx_sample_start_index"] = start_index
+        l1b_arrays["rxwaveform"] = rxwaveform
+
+        l2a_arrays = {
+            dataset: l2a_beam.extract_dataset(dataset)[()]
+            for dataset in L2A_SHOT_FIELDS.values()
+        }
+
+        beam_waveforms = []
+        kept_indices = []
+        for shot_index in candidates:
+            new_wf = Waveform.from_beam_arrays(
+                shot_number=shot_numbers[shot_index],
+                shot_index=int(shot_index),
+                beam_name=beam_name,
+                l1b_arrays=l1b_arrays,
+                l2a_arrays=l2a_arrays,
+                l1b_path=l1b.filename,
+                l2a_path=l2a.filename,
+            )
+            if all(filt(new_wf) for filt in waveform_filters):
+                beam_waveforms.append(new_wf)
+                kept_indices.append(shot_index)
+
+        # Keep the per-shot values of the retained shots as columns
+        kept_indices = np.asarray(kept_indices, dtype=np.intp)
+        beam_columns = {
+            "metadata/shot_number": shot_numbers[kept_indices],
+            "metadata/shot_index": kept_indices,
+            "metadata/beam": np.full(len(kept_indices), beam_name),
+        }
+        for arrays, fields in (
+            (l1b_arrays, L1B_COORD_FIELDS),
+            (l1b_arrays, L1B_SHOT_FIELDS),
+            (l2a_arrays, L2A_SHOT_FIELDS),
+        ):
+            for path, dataset in fields.items():
+                beam_columns[path] = arrays[dataset][kept_indices]
+
+        return beam_waveforms, beam_columns
 
     def filter_waveform(self, wf: Waveform) -> bool:
         """Apply filters to a waveform."""
@@ -123,13 +358,69 @@ class WaveformCollection:
     def add_waveform(self, wf: Waveform) -> None:
         """Add a waveform to collection."""
         self.waveforms.append(wf)
+        # Index by shot number, keeping the first waveform for a shot
+        self._by_shot.setdefault(wf.get_data("metadata/shot_number"), wf)
+        # Columns no longer cover every waveform
+        self._columns.clear()
+        self._ragged_columns.clear()
+
+    def get_column(self, path: str) -> np.ndarray:
+        """Get the data at path for every waveform as one read-only array,
+        in collection order.
+
+        Columns of values read from the beams are loaded when the
+        collection is constructed; other columns are assembled from the
+        waveforms on first request and reused afterwards. Data must have
+        the same shape for every waveform; see get_ragged_column for
+        variable-length arrays.
+        """
+        if path not in self._columns:
+            column = np.asarray([wf.get_data(path) for wf in self.waveforms])
+            column.setflags(write=False)
+            self._columns[path] = column
+        return self._columns[path]
+
+    def save_bulk(self, path: str, values: ArrayLike) -> None:
+        """Save one value per waveform at path, in collection order.
+
+        If values is an array, a read-only copy of it is also kept as
+        the column for path, so that get_column need not gather the
+        values back from the waveforms.
+        """
+        if len(values) != len(self.waveforms):
+            raise ValueError(
+                f"Got {len(values)} values to save at {path} for "
+                f"{len(self.waveforms)} waveforms."
+            )
+        for wf, value in zip(self.waveforms, values):
+            wf.save_data(value, path)
+
+        if isinstance(values, np.ndarray):
+            column = values.copy()
+            column.setflags(write=False)
+            self._columns[path] = column
+
+    def get_ragged_column(self, path: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Get variable-length array data at path for every waveform.
+
+        Returns the arrays concatenated in collection order, along with
+        offsets such that the data for waveform i is
+        values[offsets[i]:offsets[i + 1]]. Like get_column, the result is
+        read-only and reused for later requests.
+        """
+        if path not in self._ragged_columns:
+            arrays = [np.asarray(wf.get_data(path)) for wf in self.waveforms]
+            offsets = np.zeros(len(arrays) + 1, dtype=np.intp)
+            np.cumsum([len(arr) for arr in arrays], out=offsets[1:])
+            values = np.concatenate(arrays) if arrays else np.empty(0)
+            values.setflags(write=False)
+            offsets.setflags(write=False)
+            self._ragged_columns[path] = (values, offsets)
+        return self._ragged_columns[path]
 
     def get_waveform(self, shot_number: int) -> Optional[Waveform]:
         """Get a waveform by shot number."""
-        for wf in self.waveforms:
-            if wf.get_data("metadata/shot_number") == shot_number:
-                return wf
-        return None
+        return self._by_shot.get(shot_number)
 
     def __iter__(self):
         return iter(self.waveforms)
@@ -139,3 +430,44 @@ class WaveformCollection:
 
     def __getitem__(self, index):
         return self.waveforms[index]
+
+
+def _pack_samples(
+    samples: np.ndarray,
+    start_index: np.ndarray,
+    count: np.ndarray,
+    shot_indices: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Gather the samples of the given shots into one contiguous array.
+
+    start_index holds each shot's 1-based start index within samples, as
+    in rx_sample_start_index, and count its number of samples. Returns the
+    packed samples along with 1-based start indices into them for every
+    shot, which are only meaningful for the shots in shot_indices.
+    """
+    counts = count[shot_indices].astype(np.intp)
+    offsets = np.zeros(len(counts) + 1, dtype=np.intp)
+    np.cumsum(counts, out=offsets[1:])
+
+    # Index of every packed sample within the original samples
+    sample_idxs = np.arange(offsets[-1]) + np.repeat(
+        start_index[shot_indices].astype(np.intp) - 1 - offsets[:-1], counts
+    )
+
+    packed_start_index = np.zeros_like(start_index)
+    packed_start_index[shot_indices] = offsets[:-1] + 1
+    return samples[sample_idxs], packed_start_index
+
+
+def _build_beam_waveforms_from_paths(
+    l1b_path: str, l2a_path: str, beam_name: str, pickled_args: bytes
+) -> Tuple[List[Waveform], Dict[str, np.ndarray]]:
+    """Construct a beam's Waveforms and columns in a worker process,
+    opening the files by path. pickled_args holds the remaining arguments
+    of WaveformCollection._build_beam_waveforms, serialized with dill."""
+    build_args = dill.loads(pickled_args)
+    l1b, l2a = WaveformCollection.open_files(l1b_path, l2a_path)
+    with l1b, l2a:
+        return WaveformCollection._build_beam_waveforms(
+            l1b, l2a, beam_name, *build_args
+        )
@@ -1,10 +1,22 @@
-from dataclasses import dataclass
-from typing import Dict, Optional
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
 
 import matplotlib.pyplot as plt
+from matplotlib.axes import Axes
+from matplotlib.figure import Figure
 
+from nmbim.NestedDict import NestedDict
 from nmbim.Waveform import Waveform
 
+# Marker and line style for each layer type
+LAYER_STYLES: Dict[str, Dict[str, str]] = {
+    "scatter": {"marker": "o", "linestyle": ""},
+    "line": {"marker": "", "linestyle": "-"},
+}
+
+SHOT_NUMBER_KEYS = NestedDict.split_path("metadata/shot_number")
+BIOMASS_INDEX_KEYS = NestedDict.split_path("results/biomass_index")
+
 
 @dataclass
 class WaveformPlotter:
@@ -25,42 +37,75 @@ class WaveformPlotter:
 
     y_path: str
         The path to the data to plot on the y-axis.
+
+    dpi: int
+        The resolution of saved plots.
+
+    The layer configuration is resolved once, when the plotter is
+    created, so changes to layer_dict afterwards are not plotted.
     """
 
     layer_dict: Dict[str, Dict[str, str]]
     x_lab: Optional[str] = None
     y_lab: Optional[str] = None
+    dpi: int = 150
 
-    def plot(self, wf: Waveform):
-        """Plot the data from the Waveform object and store the figure."""
-        # Create a new figure
-        self.last_fig, ax = plt.subplots(figsize=(12, 8))
+    # Layer name, split x and y paths, and plot keyword arguments
+    _layers: List[
+        Tuple[str, Tuple[str, ...], Tuple[str, ...], Dict[str, Any]]
+    ] = field(init=False, default_factory=list, repr=False)
 
-        # Add data layers
-        for layer_name, layer_data in self.layer_dict.items():
-            x_path, y_path = layer_data["x"], layer_data["y"]
-            x_data, y_data = wf.get_data(x_path), wf.get_data(y_path)
+    # Figure and axes reused across calls to plot, and the last shot plotted
+    last_fig: Optional[Figure] = field(init=False, default=None, repr=False)
+    _ax: Optional[Axes] = field(init=False, default=None, repr=False)
+    last_shot: Optional[int] = field(init=False, default=None, repr=False)
 
+    def __post_init__(self) -> None:
+        for layer_name, layer_data in self.layer_dict.items():
             # Format as scatter or line depending on layer type
             layer_type = layer_data.get("type", "scatter")
-            if layer_type == "scatter":
-                marker = "o"
-                linestyle = ""
-            elif layer_type == "line":
-                linestyle = "-"
-                marker = ""
-
-            # Plot the layer data
+            if layer_type not in LAYER_STYLES:
+                raise ValueError(
+                    f"Unknown type '{layer_type}' for layer {layer_name}. "
+                    f"Expected one of {list(LAYER_STYLES)}."
+                )
+            plot_kwargs = {
+                "color": layer_data.get("color", "b"),
+                **LAYER_STYLES[layer_type],
+                "markersize": 2,
+                "linewidth": 2.5,
+                "label": layer_name,
+                "antialiased": True,
+                # Keep vector output small for waveforms with many returns
+                "rasterized": True,
+            }
+            self._layers.append(
+                (
+                    layer_name,
+                    NestedDict.split_path(layer_data["x"]),
+                    NestedDict.split_path(layer_data["y"]),
+                    plot_kwargs,
+                )
+            )
+
+    def plot(self, wf: Waveform):
+        """Plot the data from the Waveform object and store the figure.
+        The plot is not displayed; call show() to display it."""
+        # Reuse the figure from the previous plot unless it has been closed
+        if self.last_fig is None or not plt.fignum_exists(
+            self.last_fig.number
+        ):
+            self.last_fig, self._ax = plt.subplots(figsize=(12, 8))
+        else:
+            self._ax.clear()
+        ax = self._ax
+
+        # Add data layers
+        for _, x_keys, y_keys, plot_kwargs in self._layers:
             ax.plot(
-                x_data,
-                y_data,
-                color=layer_data.get("color", "b"),
-                marker=marker,
-                linestyle=linestyle,
-                markersize=2,
-                linewidth=2.5,
-                label=layer_name,
-                antialiased=True,
+                wf.get_data_by_keys(x_keys),
+                wf.get_data_by_keys(y_keys),
+                **plot_kwargs,
             )
 
         # Add a horizontal dashed line at height = 0
@@ -79,7 +124,7 @@ class WaveformPlotter:
             ax.set_ylabel(self.y_lab, fontsize=label_size)
 
         # Add a title based on the shot number
-        shot_number = wf.get_data("metadata/shot_number")
+        shot_number = wf.get_data_by_keys(SHOT_NUMBER_KEYS)
         ax.set_title(
             f"Waveform processing for GEDI shot {shot_number}",
             fontsize=title_size,
@@ -88,7 +133,7 @@ class WaveformPlotter:
         )
 
         # Add an annotation with the biomass index
-        biomass_index = wf.get_data("results/biomass_index")
+        biomass_index = wf.get_data_by_keys(BIOMASS_INDEX_KEYS)
         ax.annotate(
             f"Biomass index: {biomass_index:.2f}",
             xy=(0.70, 0.05),
@@ -100,15 +145,21 @@ class WaveformPlotter:
         # Store the last shot number for saving
         self.last_shot = shot_number
 
-        # Show the plot
-        plt.show()
+    def show(self):
+        """Display the current plot."""
+        if self.last_fig is not None:
+            plt.show()
+        else:
+            print("No plot to show.")
 
     def save(self):
         """Save the current plot to a file."""
         if self.last_fig is not None and self.last_shot is not None:
             self.last_fig.savefig(
                 f"waveform_plot_{self.last_shot}.png",
-                dpi=600,
+                dpi=self.dpi,
+                # Favour encoding speed over file size
+                pil_kwargs={"compress_level": 1},
             )
         else:
             print("No plot to save.")
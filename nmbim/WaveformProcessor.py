@@ -1,37 +1,20 @@
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
-from typing import Any, Callable, Dict, Iterable, Optional, Union
+from functools import partial
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
 
-from nmbim import Waveform, WaveformCollection
+import numpy as np
 
+from nmbim import NestedDict, Waveform, WaveformCollection
 
-class ProcessorState:
-    """Stores the state of a WaveformProcessor object, which is otherwise immutable.
 
-    Attributes
-    ----------
-    processed: bool
-        Indicates whether the WaveformProcessor has been processed.
-
-    waveform_iter: Iterator[Waveform]
-        Iterator over the collection of Waveforms to process.
-    """
-
-    def __init__(self) -> None:
-        self.processed: bool = False
-
-    def mark_processed(self) -> None:
-        self.processed = True
+def _apply(alg_fun: Callable, params: Dict[str, Any], data: Dict[str, Any]):
+    # Apply an algorithm to one waveform's input data in a worker process
+    return alg_fun(**data, **params)
 
-    def set_waveform_iter(
-        self, waveforms: Union[WaveformCollection, Iterable[Waveform]]
-    ) -> None:
-        self.waveform_iter = iter(waveforms)
 
-    def was_processed(self) -> bool:
-        return self.processed
-
-
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class WaveformProcessor:
     """Processes one collection of Waveforms in-place with one algorithm.
 
@@ -65,11 +48,25 @@ class WaveformProcessor:
     Path indicating where to save processed data in
     each Waveform.
 
+    mpi_comm: Optional[Any]
+    MPI communicator (e.g. mpi4py's MPI.COMM_WORLD) for distributing
+    the Waveforms across ranks. If supplied, each rank processes every
+    size-th Waveform starting at its rank, and the results are only
+    saved in that rank's Waveforms. Defaults to None (process all).
+
+    n_workers: int
+    Number of processes to apply the algorithm with. Only the input
+    data and results are sent between processes, not the Waveforms, so
+    alg_fun and params must be picklable (e.g. a module-level function).
+    Defaults to 1 (apply in this process). Batched algorithms always run
+    in this process.
+
     Methods
     -------
     process() -> None
         Applies the algorithm and saves the results to the Waveform.
-    Can only be called once.
+    Can only be called once. Algorithms marked with the batched
+    decorator are applied to all Waveforms in a single call.
     """
 
     alg_fun: Callable
@@ -77,9 +74,24 @@ class WaveformProcessor:
     input_map: Dict[str, str]
     output_path: str
     waveforms: Union[WaveformCollection, Iterable[Waveform]]
+    mpi_comm: Optional[Any] = None
+    n_workers: int = 1
+
+    # Waveforms this processor applies the algorithm to, and whether it
+    # has done so; set through object.__setattr__ as the class is frozen
+    _to_process: Iterable[Waveform] = field(
+        init=False, default=(), repr=False
+    )
+    _processed: bool = field(init=False, default=False, repr=False)
 
-    _state: ProcessorState = field(
-        init=False, default_factory=ProcessorState, repr=False
+    # Input paths split into keys once, rather than for every waveform
+    _input_keys: Dict[str, Tuple[str, ...]] = field(
+        init=False, default_factory=dict, repr=False
+    )
+    # Input data for the current waveform, refilled for each waveform
+    # since alg_fun receives its contents as keyword arguments
+    _data: Dict[str, Any] = field(
+        init=False, default_factory=dict, repr=False
     )
 
     def __post_init__(self) -> None:
@@ -88,45 +100,105 @@ class WaveformProcessor:
             # TODO: fix this, maybe just get rid of frozenness?
             object.__setattr__(self, "waveforms", [self.waveforms])
 
-        self._state.set_waveform_iter(self.waveforms)
+        waveforms = self.waveforms
+        if self.mpi_comm is not None:
+            rank = self.mpi_comm.Get_rank()
+            size = self.mpi_comm.Get_size()
+            waveforms = islice(waveforms, rank, None, size)
+        object.__setattr__(self, "_to_process", waveforms)
+
+        for key, path_to_data in self.input_map.items():
+            self._input_keys[key] = NestedDict.split_path(path_to_data)
 
     def process(self) -> None:
         """Apply the algorithm to each waveform in the collection and
         save the results. Can only be called once to prevent
         accidental reprocessing.
         """
-        if self._state.was_processed():
+        if self._processed:
             raise RuntimeError(
                 "This WaveformProcessor has already been processed."
             )
 
-        while self._process_next() is not None:
-            pass
-
-        self._state.mark_processed()
-
-    def _get_next(self) -> Optional[Waveform]:
-        try:
-            return next(self._state.waveform_iter)
-        except StopIteration:
-            return None
-
-    def _process_next(self) -> Optional[Waveform]:
-        # Apply the algorithm to the next waveform in the collection
-        waveform = self._get_next()
-
-        if waveform is not None:
+        if getattr(self.alg_fun, "batched", False):
+            self._process_batch()
+        elif self.n_workers > 1:
+            self._process_parallel()
+        else:
+            self._process_serial()
+
+        object.__setattr__(self, "_processed", True)
+
+    def _process_batch(self) -> None:
+        # Apply a batched algorithm to all waveforms at once
+        waveforms: List[Waveform] = list(self._to_process)
+
+        # Gather each input across waveforms, stacking where possible
+        data: Dict[str, Any] = {}
+        for key, keys in self._input_keys.items():
+            values = [wf.get_data_by_keys(keys) for wf in waveforms]
+            try:
+                data[key] = np.stack(values) if values else np.empty(0)
+            except ValueError:
+                # Data of differing shapes (e.g. waveforms) stays a list
+                data[key] = values
+
+        results = self.alg_fun(**data, **self.params)
+
+        if len(results) != len(waveforms):
+            raise ValueError(
+                f"Batched algorithm {self.alg_fun.__name__} returned "
+                f"{len(results)} results for {len(waveforms)} waveforms."
+            )
+        if isinstance(self.waveforms, WaveformCollection) and len(
+            waveforms
+        ) == len(self.waveforms):
+            # All of the collection's waveforms were processed, so the
+            # results can also be kept as its column
+            self.waveforms.save_bulk(self.output_path, results)
+        else:
+            for waveform, result in zip(waveforms, results):
+                waveform.save_data(result, self.output_path)
+
+    def _process_parallel(self) -> None:
+        # Apply the algorithm to the waveforms' input data in a pool of
+        # processes and save the results in this process
+        waveforms: List[Waveform] = list(self._to_process)
+        inputs = [self._get_inputs(waveform) for waveform in waveforms]
+        chunksize = max(1, len(inputs) // (4 * self.n_workers))
+
+        with ProcessPoolExecutor(max_workers=self.n_workers) as executor:
+            all_results = executor.map(
+                partial(_apply, self.alg_fun, self.params),
+                inputs,
+                chunksize=chunksize,
+            )
+            for waveform, results in zip(waveforms, all_results):
+                waveform.save_data(results, self.output_path)
+
+    def _get_inputs(self, waveform: Waveform) -> Dict[str, Any]:
+        # Get input data from waveform
+        return {
+            key: waveform.get_data_by_keys(keys)
+            for key, keys in self._input_keys.items()
+        }
+
+    def _process_serial(self) -> None:
+        # Apply the algorithm to each waveform in turn, with everything
+        # that is the same for all waveforms bound to locals once
+        alg_fun = self.alg_fun
+        params = self.params
+        output_path = self.output_path
+        input_items = tuple(self._input_keys.items())
+        data = self._data
+
+        for waveform in self._to_process:
             # Get input data from waveform
-            data: Dict[str, Any] = {}
-
-            for key in self.input_map:
-                path_to_data: str = self.input_map[key]
-                data[key] = waveform.get_data(path_to_data)
+            for key, keys in input_items:
+                data[key] = waveform.get_data_by_keys(keys)
 
             # Apply algorithm
-            results = self.alg_fun(**data, **self.params)
+            results = alg_fun(**data, **params)
 
             # Save results to waveform
-            waveform.save_data(results, self.output_path)
-
-        return waveform
+            waveform.save_data(results, output_path)
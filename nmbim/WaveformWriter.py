@@ -1,18 +1,32 @@
 import csv
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, Iterable, Optional, Union
+from typing import Any, Dict, Iterable, List, Optional, Union
 import warnings
 from datetime import datetime
 
 import geopandas as gpd
 import numpy as np
-from shapely.geometry import Point
 
 from nmbim.Waveform import Waveform
+from nmbim.WaveformCollection import WaveformCollection
 
+# Write GeoPackages through GDAL's Arrow interface if pyarrow is available
+try:
+    import pyarrow  # noqa: F401
 
-@dataclass
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+# Maximum number of rows gathered before they are written to a CSV file
+CSV_BLOCK_ROWS = 100_000
+
+# Types of data written as a single row per waveform
+SINGLE_VALUE_TYPES = (int, float, str, np.floating, np.integer, datetime)
+
+
+@dataclass(slots=True)
 class WaveformWriter:
     """
     Class for writing data to a CSV file from a collection of Waveforms.
@@ -38,6 +52,8 @@ class WaveformWriter:
     append: bool
     waveforms: Iterable[Waveform]
 
+    # Type of file to write, from the path's suffix
+    _file_type: str = field(default=None, init=False, repr=False)
     # Data dictionary for the current waveform
     _waveform_data: Dict[str, Any] = field(
         default_factory=dict, init=False, repr=False
@@ -50,12 +66,16 @@ class WaveformWriter:
     _n_rows: int = field(default=None, init=False, repr=False)
 
     def __post_init__(self) -> None:
-        if isinstance(self.path, str):
+        if not isinstance(self.path, Path):
             self.path = Path(self.path)
         self._file_type = self.path.suffix.lstrip(".")
         if self._file_type not in ["csv", "gpkg"]:
             raise ValueError(f"Unsupported file type {self._file_type}")
 
+        # Materialize waveforms given as a one-shot iterator (e.g. a
+        # generator) once, so they can be both counted and written
+        if not hasattr(self.waveforms, "__len__"):
+            self.waveforms = list(self.waveforms)
         self._waveform_iter = iter(self.waveforms)
 
     def _get_next(self):
@@ -72,21 +92,16 @@ class WaveformWriter:
 
         if waveform is not None:
             self._waveform_data.clear()
+            self._n_rows = None
             for col_name, col_path in self.cols.items():
                 # Depending on requested column, data might be a
                 # single value (e.g. biomass index) or an array of
                 # values (e.g. raw waveform). Both are okay as long as
                 # all columns requested are of the same length, which
-                # is checked in WaveformWriter._validate_row_lengths.
+                # is checked as each column is loaded.
                 col_data = waveform.get_data(col_path)
                 # Cast single values to list for length validation
-                single_val_types = (int,
-                                    float,
-                                    str,
-                                    np.floating,
-                                    np.integer,
-                                    datetime)
-                if isinstance(col_data, single_val_types):
+                if isinstance(col_data, SINGLE_VALUE_TYPES):
                     col_data = [col_data] 
                 
                 # Check if data is a list or numpy array
@@ -95,23 +110,66 @@ class WaveformWriter:
                         f"Unwritable data type {type(col_data)} in "
                         f"column {col_name}"
                     )
-                self._waveform_data[col_name] = col_data
 
-            # Update the number of rows based on the first column provided
-            self._n_rows = len(list(self._waveform_data.values())[0])
+                # The number of rows is set by the first column provided
+                col_len = len(col_data)
+                if self._n_rows is None:
+                    self._n_rows = col_len
+                elif col_len != self._n_rows:
+                    raise ValueError(
+                        f"All columns must have the same length; "
+                        f"column {col_name} has length {col_len}, "
+                        f"but the first column has length {self._n_rows}"
+                    )
+                self._waveform_data[col_name] = col_data
 
         return waveform
 
-    def _validate_row_lengths(self) -> None:
-        # Validate types and lengths of columns in loaded data
+    def _empty_columns(self) -> Dict[str, List[Any]]:
+        # Output columns, each holding a list of values across rows
+        return {
+            "shot_number": [],
+            "beam": [],
+            **{col_name: [] for col_name in self.cols},
+        }
+
+    def _extend_columns(
+        self, columns: Dict[str, List[Any]], wf: Waveform
+    ) -> None:
+        # Add the rows for a waveform whose data is loaded to columns
+        shot_number = str(wf.get_data("metadata/shot_number"))
+        beam = wf.get_data("metadata/beam")
+        columns["shot_number"].extend([shot_number] * self._n_rows)
+        columns["beam"].extend([beam] * self._n_rows)
         for col_name, col_data in self._waveform_data.items():
-            col_len = len(col_data)
-            if col_len != self._n_rows:
-                raise ValueError(
-                    f"All columns must have the same length; "
-                    f"column {col_name} has length {col_len}, "
-                    f"but the first column has length {self._n_rows}"
-                )
+            columns[col_name].extend(col_data)
+
+    def _collection_columns(self) -> Optional[Dict[str, np.ndarray]]:
+        # Output columns read in bulk from a WaveformCollection, with
+        # longitude and latitude, if every column has a single value per
+        # waveform; otherwise None, and the rows are gathered per waveform
+        if not isinstance(self.waveforms, WaveformCollection):
+            return None
+        first = self.waveforms[0]
+        if not all(
+            isinstance(first.get_data(col_path), SINGLE_VALUE_TYPES)
+            for col_path in self.cols.values()
+        ):
+            return None
+
+        collection = self.waveforms
+        return {
+            "shot_number": collection.get_column(
+                "metadata/shot_number"
+            ).astype(str),
+            "beam": collection.get_column("metadata/beam"),
+            **{
+                col_name: collection.get_column(col_path)
+                for col_name, col_path in self.cols.items()
+            },
+            "lon": collection.get_column("metadata/coords/lon"),
+            "lat": collection.get_column("metadata/coords/lat"),
+        }
 
     def _to_csv(self) -> None:
         """
@@ -134,60 +192,61 @@ class WaveformWriter:
 
             # Write header if file is empty
             if csv_file.tell() == 0:
-                header = ["shot_number", "beam"] + list(
-                    self._waveform_data.keys()
-                )
-                writer.writerow(header)
+                writer.writerow(self._empty_columns().keys())
 
-            # Write data for each waveform
+            # Gather rows column by column across waveforms and write
+            # them in blocks, so that csv.writer loops over the rows
+            columns = self._empty_columns()
+            n_block_rows = 0
             while wf is not None:
-                self._validate_row_lengths()
-
-                # Get metadata for current waveform
-                shot_number: str = str(wf.get_data("metadata/shot_number"))
-                beam: str = wf.get_data("metadata/beam")
-
-                # Construct and write data rows for current waveform
-                wf_data: dict = self._waveform_data
-                for i in range(self._n_rows):
-                    row = [shot_number, beam] + [
-                        col_data[i] for col_data in wf_data.values()
-                    ]
-                    writer.writerow(row)
+                self._extend_columns(columns, wf)
+                n_block_rows += self._n_rows
 
                 # Load data from the next waveform
                 wf = self._load_next_waveform()
 
-    def _to_gpkg(self) -> None:
-        rows = []
-        wf = self._load_next_waveform()
-
-        while wf is not None:
-            self._validate_row_lengths()
-            shot_number = str(wf.get_data("metadata/shot_number"))
-            beam = wf.get_data("metadata/beam")
-            lon = wf.get_data("metadata/coords/lon")
-            lat = wf.get_data("metadata/coords/lat")
-
-            for i in range(self._n_rows):
-                geometry = Point(lon, lat)
-                row = {
-                    "shot_number": shot_number,
-                    "beam": beam,
-                    **{
-                        col_name: self._waveform_data[col_name][i]
-                        for col_name in self._waveform_data
-                    },
-                    "geometry": geometry,
-                }
-
-                rows.append(row)
+                if n_block_rows >= CSV_BLOCK_ROWS or wf is None:
+                    writer.writerows(zip(*columns.values()))
+                    columns = self._empty_columns()
+                    n_block_rows = 0
 
+    def _to_gpkg(self) -> None:
+        columns = self._collection_columns()
+        if columns is not None:
+            lons = columns.pop("lon")
+            lats = columns.pop("lat")
+        else:
+            # Gather the data column by column across waveforms
+            columns = self._empty_columns()
+            lons: List[float] = []
+            lats: List[float] = []
             wf = self._load_next_waveform()
 
-        gdf = gpd.GeoDataFrame(rows, geometry="geometry", crs="EPSG:4326")
+            while wf is not None:
+                self._extend_columns(columns, wf)
+                lon = wf.get_data("metadata/coords/lon")
+                lat = wf.get_data("metadata/coords/lat")
+                lons.extend([lon] * self._n_rows)
+                lats.extend([lat] * self._n_rows)
+
+                wf = self._load_next_waveform()
 
-        gdf.to_file(self.path, driver="GPKG", mode="a" if self.append else "w")
+        # Build all point geometries in one vectorized call
+        gdf = gpd.GeoDataFrame(
+            columns,
+            geometry=gpd.points_from_xy(lons, lats),
+            crs="EPSG:4326",
+        )
+
+        # pyogrio hands the columns to GDAL in bulk rather than per
+        # feature, as contiguous Arrow buffers where possible
+        gdf.to_file(
+            self.path,
+            driver="GPKG",
+            mode="a" if self.append else "w",
+            engine="pyogrio",
+            use_arrow=ARROW_AVAILABLE,
+        )
 
     def write(self) -> None:
         """Write the waveforms to the file if there are any."""
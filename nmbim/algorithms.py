@@ -2,15 +2,28 @@
 # Algorithms for processing waveform data with the NMBIM model. #
 #################################################################
 import warnings
-from typing import Dict, Union
+from functools import lru_cache
+from typing import Dict, List, Optional, Union
 
 import numpy as np
 from numpy.typing import ArrayLike
 from scipy import ndimage
 
+from nmbim.batching import batched
+
 IntOrFloat = Union[int, float]
 
 
+def _in_wf_dtype(value: IntOrFloat, wf: ArrayLike) -> IntOrFloat:
+    # Cast a scalar to the dtype of a floating point waveform, so that
+    # arithmetic between them keeps the waveform's precision (GEDI
+    # waveforms are float32) rather than promoting it to float64
+    dtype = np.asarray(wf).dtype
+    if np.issubdtype(dtype, np.floating):
+        return dtype.type(value)
+    return value
+
+
 def calc_dz(ht: ArrayLike) -> float:
     """
     Calculate height increment (dz) between waveform returns.
@@ -37,18 +50,20 @@ def scale_raw_wf(
     Replicates the normalization and scaling used on the smoothed waveform
     so that the raw waveform can be compared to the smoothed waveform.
     """
-    if (np.nansum(wf_smooth) * dz) == 0:
+    scale = np.nansum(wf_smooth) * dz
+    if scale == 0:
         warnings.warn("Smoothed waveform sum is zero, returning zero array.")
         scaled_raw = np.zeros_like(wf_raw)
     else:
-        scaled_raw = wf_raw / (np.nansum(wf_smooth) * dz)
+        scaled_raw = wf_raw / _in_wf_dtype(scale, wf_raw)
     
     return scaled_raw
 
 
 def remove_noise(wf: ArrayLike, mean_noise: float) -> ArrayLike:
     """Remove mean noise from waveform with floor of zero."""
-    return np.maximum(wf - mean_noise, 0)
+    wf_no_noise = np.subtract(wf, mean_noise)
+    return np.maximum(wf_no_noise, 0, out=wf_no_noise)
 
 
 def calc_noise(
@@ -82,9 +97,9 @@ def calc_noise(
     noise_ratio : float, optional
         Factor by which to multiply the mean noise level.
     """
-    # Get indices of waveform returns above canopy and below ground
-    noise_idxs = np.where((ht > veg_top) | (ht < ground_bottom))
-    noise = np.mean(wf[noise_idxs]) * noise_ratio
+    # Select waveform returns above canopy and below ground
+    noise_mask = (ht > veg_top) | (ht < ground_bottom)
+    noise = np.mean(wf[noise_mask]) * noise_ratio
     return noise
 
 
@@ -114,19 +129,19 @@ def create_ground_return(
         return height.
     """
 
-    ground_index = np.where(np.abs(ht) == np.min(np.abs(ht)))
-    ground_peak = wf[ground_index]
+    wf = np.asarray(wf)
+    ht = np.asarray(ht)
 
-    # Initialize new array of same length as wf
-    ground_wf = np.zeros_like(wf)
+    ground_index = np.argmin(np.abs(ht))
+    ground_peak = wf[ground_index]
 
     # Define standard deviation for Gaussian
     sigma = ground_return_max_height * sd_ratio
 
-    # Assign values as a Gaussian centered at the ground return
-    for i in range(len(ground_wf)):
-        ground_wf[i] = np.exp(-(ht[i] ** 2) / (2 * sigma**2))
-    ground_wf = np.round(ground_wf, 2)
+    # Assign values as a Gaussian centered at the ground return,
+    # with the same dtype as wf
+    ground_wf = np.exp(-(ht**2) / (2 * sigma**2)).astype(wf.dtype)
+    np.round(ground_wf, 2, out=ground_wf)
 
     # Scale to the peak of the ground return
     ground_wf *= ground_peak
@@ -134,9 +149,90 @@ def create_ground_return(
     return ground_wf
 
 
+@lru_cache(maxsize=32)
+def _gaussian_kernel(sd: IntOrFloat, truncate: float = 4.0) -> np.ndarray:
+    # Normalized Gaussian kernel, built as in ndimage.gaussian_filter1d so
+    # that it only needs to be built once for each standard deviation
+    radius = int(truncate * float(sd) + 0.5)
+    x = np.arange(-radius, radius + 1)
+    kernel = np.exp(-0.5 / (float(sd) * float(sd)) * x**2)
+    kernel /= kernel.sum()
+    kernel.flags.writeable = False
+    return kernel
+
+
 def smooth_waveform(wf: ArrayLike, sd: IntOrFloat) -> ArrayLike:
     # Smooth waveform using Gaussian filter
-    return ndimage.gaussian_filter1d(wf, sd)
+    return ndimage.convolve1d(wf, _gaussian_kernel(sd), mode="reflect")
+
+
+@batched
+def smooth_waveform_batch(
+    wf: Union[np.ndarray, List[ArrayLike]], sd: IntOrFloat
+) -> Union[np.ndarray, List[ArrayLike]]:
+    """
+    Smooth many waveforms at once using a Gaussian filter.
+
+    Batched counterpart of smooth_waveform. Waveforms of equal length
+    arrive stacked in a 2D array (one row per waveform) and are smoothed
+    in a single call; waveforms of differing lengths arrive as a list and
+    are smoothed one at a time.
+    """
+    if isinstance(wf, np.ndarray) and wf.ndim == 2:
+        return ndimage.convolve1d(
+            wf, _gaussian_kernel(sd), axis=-1, mode="reflect"
+        )
+    return [smooth_waveform(single_wf, sd) for single_wf in wf]
+
+
+def score_local_peaks(
+    wf: ArrayLike, h: int = 10, c0: float = 0.0
+) -> np.ndarray:
+    """
+    Score each waveform return by how strongly it stands out as a local
+    peak, for finding candidate modes.
+
+    Each return gets one point for being above the return h samples
+    before it, one for being above the return h samples after it, and
+    one for exceeding the minimum within h samples on either side by more
+    than c0 (points are subtracted for being below instead). Returns
+    with a score of 3 are candidate peaks, e.g. np.flatnonzero(score == 3).
+
+    Parameters
+    ----------
+    wf : ArrayLike
+        Waveform returns.
+
+    h : int, optional
+        Distance in samples to the neighbouring returns compared against.
+        Near the ends of the waveform, the first or last return stands in
+        for returns beyond them, so returns fewer than h samples from an
+        end cannot score 3.
+
+    c0 : float, optional
+        Amount by which a return must exceed the local minimum.
+
+    Returns
+    -------
+    np.ndarray
+        Peak score (-3 to 3) of each return.
+    """
+    wf = np.asarray(wf)
+    n_samples = len(wf)
+
+    # Returns h samples before and after each return, repeating the
+    # first and last returns past the ends rather than wrapping around
+    padded = np.pad(wf, h, mode="edge")
+    before = padded[:n_samples]
+    after = padded[2 * h :]
+    local_min = ndimage.minimum_filter1d(wf, size=2 * h + 1, mode="nearest")
+
+    score = (
+        np.sign(wf - before)
+        + np.sign(wf - after)
+        + np.sign(wf - local_min - c0)
+    )
+    return score.astype(np.int8)
 
 
 def truncate_waveform(
@@ -165,10 +261,8 @@ def truncate_waveform(
     truncated_wf : ArrayLike
         Truncated waveform returns.
     """
-    trunc_wf = wf.copy()
     mask = (ht >= floor) & (ht <= ceiling)
-    trunc_wf[~mask] = np.nan
-    return trunc_wf
+    return np.where(mask, wf, np.nan)
 
 
 def calc_biomass_index(
@@ -182,7 +276,18 @@ def calc_biomass_index(
     if n_modes == 1:
         return 0
 
-    biomass_index = np.nansum(dp_dz * np.abs(ht) ** hse)
+    dp_dz = np.asarray(dp_dz)
+
+    # Weight the returns by height raised to the HSE, reusing the array
+    # of weights for the product unless that would narrow its dtype
+    weighted = np.abs(ht) ** hse
+    if weighted.dtype == np.result_type(weighted, dp_dz):
+        weighted *= dp_dz
+    else:
+        weighted = weighted * dp_dz
+
+    # Accumulate in double precision even if the heights are float32
+    biomass_index = np.nansum(weighted, dtype=np.float64)
     biomass_index *= dz
     return biomass_index
 
@@ -212,17 +317,34 @@ def calc_height(
     ArrayLike
         Height (m) relative to ground for each return, beginning at top
     """
-    elev_range = np.linspace(start=elev_top, stop=elev_bottom, num=len(wf))
-
+    # Elevations evenly spaced from top to bottom, as np.linspace would
+    # give, but scaling a ramp of sample indices in place
+    n_samples = len(wf)
+    dtype = np.result_type(elev_top, elev_bottom, 1.0)
+    step = np.subtract(elev_bottom, elev_top, dtype=dtype) / max(
+        n_samples - 1, 1
+    )
+    elev_range = np.arange(n_samples, dtype=dtype)
+    elev_range *= step
+    elev_range += elev_top
+    if n_samples > 1:
+        elev_range[-1] = elev_bottom
+
+    # Heights relative to ground, in place unless that would narrow the
+    # dtype (e.g. float32 elevations with a float64 ground elevation)
+    if np.result_type(elev_range, elev_ground) == elev_range.dtype:
+        elev_range -= elev_ground
+        return elev_range
     return elev_range - elev_ground
 
 def normalize_waveform(wf: ArrayLike) -> ArrayLike:
     # Normalize waveform by dividing by total waveform sum
-    if np.nansum(wf) == 0:
+    wf_sum = np.nansum(wf)
+    if wf_sum == 0:
         warnings.warn("Waveform sum is zero, returning zero array.")
         normalized = np.zeros_like(wf)
     else:
-        normalized = np.divide(wf, np.nansum(wf))
+        normalized = np.divide(wf, wf_sum)
     return normalized
 
 
@@ -245,16 +367,21 @@ def calc_dp_dz(wf: ArrayLike, dz: float) -> ArrayLike:
     """
 
     # Calculate waveform returns per unit height (m)
-    dp_dz = wf / dz
+    dp_dz = wf / _in_wf_dtype(dz, wf)
     # Set negative return values to zero
-    dp_dz[dp_dz < 0] = 0
-    return dp_dz
+    return np.maximum(dp_dz, 0, out=dp_dz)
+
+
+def _first_index(mask: np.ndarray) -> Optional[int]:
+    # Index of the first True value in a boolean array, or None if there
+    # is none; argmax stops at the first True rather than collecting all
+    idx = int(np.argmax(mask)) if len(mask) > 0 else 0
+    return idx if len(mask) > 0 and mask[idx] else None
 
 
 def separate_veg_ground(
     wf: ArrayLike,
     ht: ArrayLike,
-    dz: float,
     rh: ArrayLike,
     min_veg_bottom: float,
     max_veg_bottom: float,
@@ -293,38 +420,37 @@ def separate_veg_ground(
     veg_first_idx = np.argmax(ht <= rh[100])
 
     # Get index of ground return
-    min_height = np.min(np.absolute(ht))
-    ground_idx = np.where(np.absolute(ht) == min_height)[0][0]
+    ground_idx = np.argmin(np.absolute(ht))
 
     # Calculate waveform's noise level from part of waveform above vegetation
     wf_above_veg = wf[0:veg_first_idx]
     noise = np.std(wf_above_veg) * noise_ratio
 
-    # Find indices below first ground return that are below noise level
-    # (indexes are relative to the first ground return)
-    below_ground_noise_idxs = np.where(wf[ground_idx:] < noise)[0]
+    # Find first index below first ground return that is below noise level
+    # (index is relative to the first ground return)
+    ground_offset = _first_index(wf[ground_idx:] < noise)
 
     # Check whether below-noise returns were found below first ground return
-    if len(below_ground_noise_idxs) == 0:
+    if ground_offset is None:
         # If not, redefine noise level using full above-ground waveform
         # TODO: could instead halve the noise level and try again
         wf_above_ground = wf[: ground_idx - 1]
         noise = np.std(wf_above_ground) * noise_ratio
-        # Find below-noise indices with new noise level
-        below_ground_noise_idxs = np.where(wf[ground_idx:] < noise)[0]
+        # Find below-noise index with new noise level
+        ground_offset = _first_index(wf[ground_idx:] < noise)
         # If still no below-noise returns, default to 5 m below ground
-        if len(below_ground_noise_idxs) == 0:
+        if ground_offset is None:
             warnings.warn(
                 f"No returns below noise level {noise} "
                 f"found below ground return"
             )
-            below_ground_noise_idxs = (
+            below_ground_idxs = (
                 np.where((ht[ground_idx:] > -5) & (ht[ground_idx:] < 0))
             )[0]
+            ground_offset = np.min(below_ground_idxs)
 
     # Ground return index +/- ground offset gives the indices
     # in the ground return region
-    ground_offset = np.min(below_ground_noise_idxs)
     last_ground_idx = min(ground_idx + ground_offset, len(wf) - 1)
     first_ground_idx = max(ground_idx - ground_offset, 0)
 
@@ -370,7 +496,8 @@ def isolate_vegetation(
     """
 
     # Subtract ground return from waveform
-    wf_no_ground = np.maximum(wf - ground_return, 0)
+    wf_no_ground = np.subtract(wf, ground_return)
+    np.maximum(wf_no_ground, 0, out=wf_no_ground)
 
     # Set below-ground and above-canopy returns to zero
     mask = (ht < 0) | (ht > veg_top)
@@ -419,18 +546,17 @@ def calc_gap_prob(
     veg_cuml = np.nancumsum(wf_per_height[veg_first_idx:veg_last_idx])
 
     # Calculate gap probability
-    p_gap = 1 - (veg_cuml / (veg_sum + ground_sum))
+    p_gap_veg = 1 - (veg_cuml / (veg_sum + ground_sum))
 
-    # Pad gap probability with NaNs to match length of wf_per_height
-    p_gap = np.pad(
-        p_gap,
-        (veg_first_idx, len(wf_per_height) - veg_last_idx),
-        constant_values=np.nan,
-    )
+    # Place gap probability in a NaN array matching wf_per_height in length
+    p_gap = np.full(len(wf_per_height), np.nan, dtype=p_gap_veg.dtype)
+    p_gap[veg_first_idx:veg_last_idx] = p_gap_veg
 
     # Foliage accumulation and density
-    foliage_accum = -np.log(p_gap) / foliage_constant
-    foliage_dens = wf_per_height * (1 / p_gap) / foliage_constant
+    foliage_accum = -np.log(p_gap)
+    foliage_accum /= foliage_constant
+    foliage_dens = wf_per_height * (1 / p_gap)
+    foliage_dens /= foliage_constant
 
     return {
         "veg_cover": veg_cover,
@@ -45,15 +45,20 @@ def get_beam_names():
 
 
 def process_waveforms(
-    waveforms: WaveformCollection, processor_params: Dict[str, Dict]
+    waveforms: WaveformCollection,
+    processor_params: Dict[str, Dict],
+    n_workers: int = 1,
 ):
     """Process waveforms with a pipeline of algorithms defined by
-    processor_params"""
+    processor_params. With n_workers > 1, each step applies its algorithm
+    in a pool of that many processes (see WaveformProcessor)."""
 
     pipeline = []
     for proc_name in processor_params:
         p = WaveformProcessor(
-            **processor_params[proc_name], waveforms=waveforms
+            **processor_params[proc_name],
+            waveforms=waveforms,
+            n_workers=n_workers,
         )
         pipeline.append(p)
 
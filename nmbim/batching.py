@@ -0,0 +1,15 @@
+from typing import Callable
+
+
+def batched(alg_fun: Callable) -> Callable:
+    """Marks an algorithm function as batched.
+
+    A WaveformProcessor calls a batched algorithm once for all of its
+    Waveforms instead of once per Waveform. Each input is passed as a
+    sequence with one entry per Waveform: a stacked array if the data has
+    the same shape in every Waveform, otherwise a list. Parameters are
+    passed unchanged. The algorithm must return a sequence with one result
+    per Waveform, in the same order.
+    """
+    alg_fun.batched = True
+    return alg_fun
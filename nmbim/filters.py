@@ -5,17 +5,27 @@
 # create a list of filters that are applied to each waveform. A      #
 # WaveformCollection gets such a list of filters and uses it to      #
 # determine which waveforms to include.                              #
+#                                                                    #
+# Filters that only need beam-level datasets also carry a `mask`     #
+# attribute that evaluates the same condition for every shot in a    #
+# beam at once (see nmbim.WaveformCollection.BulkFilter), which lets #
+# the collection skip constructing Waveforms that would be filtered  #
+# out.                                                               #
 ######################################################################
 
 import warnings
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Callable, Optional, Tuple, Dict, Any
 import os
 
 import geopandas as gpd
 import numpy as np
+from pyproj import Transformer
+from shapely.geometry import Point
 
-from nmbim.Waveform import Waveform
+from nmbim.Beam import Beam
+from nmbim.NestedDict import NestedDict
+from nmbim.Waveform import GPS_EPOCH, Waveform
 
 DateInterval = Tuple[Optional[datetime], Optional[datetime]]
 
@@ -58,39 +68,79 @@ def generate_temporal_filter(
     start = datetime.strptime(time_start, date_spec) if time_start else None
     end = datetime.strptime(time_end, date_spec) if time_end else None
 
+    time_keys = NestedDict.split_path("metadata/time")
+
     def temporal_filter(wf: "Waveform") -> bool:
-        wf_time = wf.get_data("metadata/time")
+        wf_time = wf.get_data_by_keys(time_keys)
         after_start = start is None or wf_time >= start
         before_end = end is None or wf_time <= end
         return after_start and before_end
 
+    def temporal_mask(l1b_beam: Beam, l2a_beam: Beam) -> np.ndarray:
+        # Compare shot times as seconds since the GEDI epoch
+        gedi_epoch = GPS_EPOCH + timedelta(
+            seconds=l1b_beam.extract_value("ancillary/master_time_epoch", 0)
+        )
+        delta_time = l1b_beam.extract_dataset("geolocation/delta_time")[()]
+        mask = np.ones(len(delta_time), dtype=bool)
+        if start is not None:
+            mask &= delta_time >= (start - gedi_epoch).total_seconds()
+        if end is not None:
+            mask &= delta_time <= (end - gedi_epoch).total_seconds()
+        return mask
+
+    temporal_filter.mask = temporal_mask
     return temporal_filter
 
 
 def generate_flag_filter() -> Callable:
     """Generate a filter based on metadata or data quality."""
 
+    quality_keys = NestedDict.split_path("metadata/flags/quality")
+
     def flag_filter(wf: Waveform) -> bool:
-        return wf.get_data("metadata/flags/quality") == 1
+        return wf.get_data_by_keys(quality_keys) == 1
 
+    def flag_mask(l1b_beam: Beam, l2a_beam: Beam) -> np.ndarray:
+        return l2a_beam.extract_dataset("quality_flag")[()] == 1
+
+    flag_filter.mask = flag_mask
     return flag_filter
 
 
 def generate_modes_filter(min_modes) -> Callable:
     """Generate a filter to keep only waveforms with more than one mode."""
 
+    num_modes_keys = NestedDict.split_path("metadata/modes/num_modes")
+
     def modes_filter(wf: Waveform) -> bool:
-        return wf.get_data("metadata/modes/num_modes") >= min_modes
+        return wf.get_data_by_keys(num_modes_keys) >= min_modes
 
+    def modes_mask(l1b_beam: Beam, l2a_beam: Beam) -> np.ndarray:
+        num_modes = l2a_beam.extract_dataset("num_detectedmodes")[()]
+        return num_modes >= min_modes
+
+    modes_filter.mask = modes_mask
     return modes_filter
 
 
 def generate_landcover_filter(min_treecover) -> Callable:
     """Generate a filter to keep only waveforms with more than 50% tree cover."""
 
+    treecover_keys = NestedDict.split_path(
+        "metadata/landcover/modis_treecover"
+    )
+
     def landcover_filter(wf: Waveform) -> bool:
-        return wf.get_data("metadata/landcover/modis_treecover") >= min_treecover
+        return wf.get_data_by_keys(treecover_keys) >= min_treecover
 
+    def landcover_mask(l1b_beam: Beam, l2a_beam: Beam) -> np.ndarray:
+        treecover = l2a_beam.extract_dataset(
+            "land_cover_data/modis_treecover"
+        )[()]
+        return treecover >= min_treecover
+
+    landcover_filter.mask = landcover_mask
     return landcover_filter
 
 
@@ -99,7 +149,7 @@ def generate_spatial_filter(
 ) -> Callable:
     """Generate a spatial filter based on a polygon layer."""
     file_path = os.path.realpath(file_path)
-    poly_gdf = gpd.read_file(file_path)
+    poly_gdf = gpd.read_file(file_path, engine="pyogrio")
 
     if poly_gdf is None:
         raise ValueError(f"The polygon file at {file_path} could not be read.")
@@ -113,12 +163,30 @@ def generate_spatial_filter(
     if poly_crs is None:
         raise ValueError("The polygon file does not have a CRS specified.")
 
-    def spatial_filter(wf: "Waveform") -> bool:
-        wf_point = wf.get_data("metadata/point_geom")
-        point_gdf = gpd.GeoSeries([wf_point], crs=waveform_crs)
-        point_gdf = point_gdf.to_crs(poly_crs)
-        return poly_gdf.contains(point_gdf.iloc[0]).any()
+    # Build the coordinate transformation and spatial index once, rather
+    # than for every waveform
+    to_poly_crs = Transformer.from_crs(waveform_crs, poly_crs, always_xy=True)
+    poly_sindex = poly_gdf.sindex
 
+    point_keys = NestedDict.split_path("metadata/point_geom")
+
+    def spatial_filter(wf: "Waveform") -> bool:
+        wf_point = wf.get_data_by_keys(point_keys)
+        x, y = to_poly_crs.transform(wf_point.x, wf_point.y)
+        return len(poly_sindex.query(Point(x, y), predicate="within")) > 0
+
+    def spatial_mask(l1b_beam: Beam, l2a_beam: Beam) -> np.ndarray:
+        # Query all footprints against the polygons' spatial index at once
+        lat = l1b_beam.extract_dataset("geolocation/latitude_bin0")[()]
+        lon = l1b_beam.extract_dataset("geolocation/longitude_bin0")[()]
+        points = gpd.GeoSeries(gpd.points_from_xy(lon, lat), crs=waveform_crs)
+        points = points.to_crs(poly_crs)
+        point_idxs, _ = poly_sindex.query(points, predicate="within")
+        mask = np.zeros(len(points), dtype=bool)
+        mask[point_idxs] = True
+        return mask
+
+    spatial_filter.mask = spatial_mask
     return spatial_filter
 
 def generate_plausible_ground_filter(window_start: float, window_end: float) -> Callable:
@@ -134,10 +202,14 @@ def generate_plausible_ground_filter(window_start: float, window_end: float) ->
     if not 0 <= window_start < window_end <= 1:
         raise ValueError("Window start and end must be between 0 and 1, with start < end.")
 
+    ground_keys = NestedDict.split_path("raw/elev/ground")
+    top_keys = NestedDict.split_path("raw/elev/top")
+    bottom_keys = NestedDict.split_path("raw/elev/bottom")
+
     def plausible_ground_filter(wf: Waveform) -> bool:
-        ground: float = wf.get_data("raw/elev/ground")
-        top: float = wf.get_data("raw/elev/top")
-        bottom: float = wf.get_data("raw/elev/bottom")
+        ground: float = wf.get_data_by_keys(ground_keys)
+        top: float = wf.get_data_by_keys(top_keys)
+        bottom: float = wf.get_data_by_keys(bottom_keys)
 
         if ground is None or top is None or bottom is None:
             return False
@@ -147,6 +219,17 @@ def generate_plausible_ground_filter(window_start: float, window_end: float) ->
         ground_relative_height = (ground - bottom) / wf_height
         return window_start < ground_relative_height < window_end
 
+    def plausible_ground_mask(l1b_beam: Beam, l2a_beam: Beam) -> np.ndarray:
+        ground = l2a_beam.extract_dataset("elev_lowestmode")[()]
+        top = l1b_beam.extract_dataset("geolocation/elevation_bin0")[()]
+        bottom = l1b_beam.extract_dataset("geolocation/elevation_lastbin")[()]
+
+        ground_relative_height = (ground - bottom) / (top - bottom)
+        return (window_start < ground_relative_height) & (
+            ground_relative_height < window_end
+        )
+
+    plausible_ground_filter.mask = plausible_ground_mask
     return plausible_ground_filter
 
 def generate_ground_to_top_filter(min_height: float) -> Callable:
@@ -164,15 +247,24 @@ def generate_ground_to_top_filter(min_height: float) -> Callable:
     Callable
         A filter function that takes a Waveform object and returns a boolean.
     """
+    ground_keys = NestedDict.split_path("raw/elev/ground")
+    top_keys = NestedDict.split_path("raw/elev/top")
+
     def ground_to_top_filter(wf: Waveform) -> bool:
-        ground: float = wf.get_data("raw/elev/ground")
-        top: float = wf.get_data("raw/elev/top")
+        ground: float = wf.get_data_by_keys(ground_keys)
+        top: float = wf.get_data_by_keys(top_keys)
 
         if ground is None or top is None:
             return False
 
         return (top - ground) > min_height
 
+    def ground_to_top_mask(l1b_beam: Beam, l2a_beam: Beam) -> np.ndarray:
+        ground = l2a_beam.extract_dataset("elev_lowestmode")[()]
+        top = l1b_beam.extract_dataset("geolocation/elevation_bin0")[()]
+        return (top - ground) > min_height
+
+    ground_to_top_filter.mask = ground_to_top_mask
     return ground_to_top_filter
 
 def get_filter_generators() -> Dict[str, Callable]:
@@ -40,7 +40,6 @@ biwf_pipeline = {
         "input_map": {
             "wf": "processed/wf_noise_removed_smooth",
             "ht": "processed/ht",
-            "dz": "processed/dz",
             "rh": "raw/rh",
         },
         "params": {
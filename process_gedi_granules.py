@@ -10,7 +10,6 @@ from typing import Any, Dict, Union, Callable, List, Optional
 from pathlib import Path
 
 import click
-import h5py
 import yaml
 
 from nmbim import WaveformCollection, app_utils, filters, algorithms
@@ -59,7 +58,8 @@ def process_beam(
     click.echo(f"Loading waveforms for beam {beam}...")
 
     try:
-        with h5py.File(l1b_path, "r") as l1b, h5py.File(l2a_path, "r") as l2a:
+        l1b, l2a = WaveformCollection.open_files(l1b_path, l2a_path)
+        with l1b, l2a:
             waveforms = WaveformCollection(
                 l1b,
                 l2a,
@@ -86,7 +86,7 @@ def process_beam(
 @click.command()
 @click.argument("l1b_path", type=click.Path(exists=True))
 @click.argument("l2a_path", type=click.Path(exists=True))
-@click.argument("output_dir", type=click.Path(exists=True))
+@click.argument("output_dir", type=click.Path(exists=True, path_type=Path))
 @click.option("--config", "-c", type=click.Path(exists=True),
               help="Path to the filter configuration YAML file.")
 @click.option("--parallel", "-p", is_flag=True, help="Run in parallel mode.")
@@ -100,7 +100,7 @@ def process_beam(
 @click.option("--date_range", help="Date range in format 'YYYY-MM-DDTHH:MM:SSZ,YYYY-MM-DDTHH:MM:SSZ'")
 def main(l1b_path: str,
          l2a_path: str,
-         output_dir: str,
+         output_dir: Path,
          config: str,
          parallel: bool,
          n_workers: int,
@@ -111,11 +111,9 @@ def main(l1b_path: str,
 
     # Set up output directory and log file
     start_time: datetime = datetime.now()
-    output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
 
     output_name = Path(app_utils.build_output_filename(l1b_path, l2a_path))
-    output_dir = Path(output_dir)
     output_path = (output_dir / output_name).with_suffix(".gpkg")
 
     logging.basicConfig(
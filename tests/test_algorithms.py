@@ -0,0 +1,29 @@
+import numpy as np
+
+from nmbim.algorithms import score_local_peaks
+
+
+def test_score_local_peaks_finds_interior_peaks():
+    wf = np.zeros(30)
+    wf[[8, 20]] = [5, 3]
+    score = score_local_peaks(wf, h=3)
+    assert score.dtype == np.int8
+    np.testing.assert_array_equal(np.flatnonzero(score == 3), [8, 20])
+
+
+def test_score_local_peaks_does_not_wrap_around():
+    # High returns at the ends must not be compared with each other, nor
+    # make the returns next to the opposite end look low
+    wf = np.array([9, 0, 0, 0, 5, 0, 0, 0, 0, 9], dtype=float)
+    score = score_local_peaks(wf, h=2)
+    np.testing.assert_array_equal(np.flatnonzero(score == 3), [4])
+    # The end returns are only compared with the returns inside
+    assert score[0] == 2 and score[-1] == 2
+    assert score[1] == -1 and score[-2] == -1
+
+
+def test_score_local_peaks_respects_c0():
+    wf = np.zeros(15)
+    wf[7] = 1
+    assert score_local_peaks(wf, h=2, c0=0.5)[7] == 3
+    assert score_local_peaks(wf, h=2, c0=2)[7] == 1
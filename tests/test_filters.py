@@ -0,0 +1,135 @@
+from datetime import timedelta
+
+import geopandas as gpd
+import h5py
+import numpy as np
+import pytest
+from shapely.geometry import box
+
+from nmbim import filters
+from nmbim.Beam import Beam
+from nmbim.Waveform import GPS_EPOCH, Waveform
+
+N_SHOTS = 200
+BEAM = "BEAM0101"
+MASTER_TIME_EPOCH = 1198800018.0
+DELTA_TIME_START = 1e7
+
+
+@pytest.fixture
+def beams(tmp_path):
+    """An L1B and L2A beam with random shots, including fill values."""
+    rng = np.random.default_rng(0)
+    n = N_SHOTS
+    counts = rng.integers(50, 100, n).astype(np.uint16)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]]) + 1
+
+    top = rng.uniform(100, 200, n)
+    bottom = top - counts * 0.15
+    ground = (top - rng.uniform(-0.1, 1.1, n) * (top - bottom)).astype(
+        np.float32
+    )
+    ground[:5] = np.nan
+    top[5:8] = np.nan
+    treecover = rng.uniform(0, 100, n).astype(np.float32)
+    treecover[8:11] = np.nan
+
+    # Whole and half seconds, so that shots fall exactly on the bounds of
+    # the temporal filters below
+    delta_time = DELTA_TIME_START + np.arange(n) / 2
+
+    l1b = h5py.File(tmp_path / "l1b.h5", "w")
+    l2a = h5py.File(tmp_path / "l2a.h5", "w")
+    g1 = l1b.create_group(BEAM)
+    g1["shot_number"] = np.arange(n, dtype=np.uint64) + 10**12
+    g1["rxwaveform"] = rng.normal(200, 3, counts.sum()).astype(np.float32)
+    g1["rx_sample_count"] = counts
+    g1["rx_sample_start_index"] = starts.astype(np.uint64)
+    g1["noise_mean_corrected"] = rng.normal(200, 1, n).astype(np.float32)
+    g1["geolocation/latitude_bin0"] = rng.uniform(40, 41, n)
+    g1["geolocation/longitude_bin0"] = rng.uniform(-80, -79, n)
+    g1["geolocation/elevation_bin0"] = top
+    g1["geolocation/elevation_lastbin"] = bottom
+    g1["geolocation/delta_time"] = delta_time
+    g1["ancillary/master_time_epoch"] = np.array([MASTER_TIME_EPOCH])
+    g2 = l2a.create_group(BEAM)
+    g2["shot_number"] = g1["shot_number"][()]
+    g2["quality_flag"] = rng.integers(0, 2, n).astype(np.uint8)
+    g2["surface_flag"] = np.ones(n, dtype=np.uint8)
+    g2["num_detectedmodes"] = rng.integers(0, 5, n).astype(np.uint8)
+    g2["land_cover_data/modis_nonvegetated"] = treecover
+    g2["land_cover_data/modis_treecover"] = treecover
+    g2["land_cover_data/landsat_treecover"] = treecover
+    g2["rh"] = rng.uniform(-3, 30, (n, 101)).astype(np.float32)
+    g2["elev_lowestmode"] = ground
+
+    yield Beam(file=l1b, beam=BEAM), Beam(file=l2a, beam=BEAM)
+    l1b.close()
+    l2a.close()
+
+
+@pytest.fixture
+def boundary_path(tmp_path):
+    path = tmp_path / "boundary.gpkg"
+    gpd.GeoDataFrame(
+        geometry=[box(-80, 40, -79.5, 41)], crs="EPSG:4326"
+    ).to_crs("EPSG:32617").to_file(path)
+    return path
+
+
+def _time_string(delta_time):
+    gedi_epoch = GPS_EPOCH + timedelta(seconds=MASTER_TIME_EPOCH)
+    shot_time = gedi_epoch + timedelta(seconds=delta_time)
+    return shot_time.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+@pytest.mark.parametrize(
+    "name, kwargs",
+    [
+        (
+            "temporal",
+            {
+                "time_start": _time_string(DELTA_TIME_START + 20),
+                "time_end": _time_string(DELTA_TIME_START + 60),
+            },
+        ),
+        (
+            "temporal",
+            {
+                "time_start": _time_string(DELTA_TIME_START + 20),
+                "time_end": None,
+            },
+        ),
+        ("flag", {}),
+        ("modes", {"min_modes": 2}),
+        ("landcover", {"min_treecover": 50}),
+        ("spatial", {}),
+        ("plausible_ground", {"window_start": 0.1, "window_end": 0.9}),
+        ("ground_to_top", {"min_height": 5}),
+    ],
+)
+def test_mask_matches_filter(beams, boundary_path, name, kwargs):
+    """Each filter's bulk mask agrees with the filter on every Waveform."""
+    if name == "spatial":
+        kwargs = {"file_path": str(boundary_path)}
+    filt = filters.get_filter_generators()[name](**kwargs)
+    l1b_beam, l2a_beam = beams
+
+    waveforms = [
+        Waveform(
+            shot_number=shot_number,
+            l1b_beam=l1b_beam,
+            l2a_beam=l2a_beam,
+            shot_index=i,
+        )
+        for i, shot_number in enumerate(
+            l1b_beam.extract_dataset("shot_number")[()]
+        )
+    ]
+    expected = np.array([filt(wf) for wf in waveforms], dtype=bool)
+    mask = filt.mask(l1b_beam, l2a_beam)
+
+    assert mask.shape == (N_SHOTS,)
+    # Both outcomes occur, so the comparison is not trivially satisfied
+    assert expected.any() and not expected.all()
+    np.testing.assert_array_equal(mask, expected)
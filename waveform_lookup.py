@@ -83,14 +83,14 @@ def cli(l1b_path, l2a_path, config):
         },
     }
 
-    plotter = WaveformPlotter(
-        layer_dict=layers, y_lab="Height (m)", x_lab="Waveform returns"
-    )
-
     # y path is constant for all layers
     for layer in layers:
         layers[layer]["y"] = "processed/ht"
 
+    plotter = WaveformPlotter(
+        layer_dict=layers, y_lab="Height (m)", x_lab="Waveform returns"
+    )
+
     with h5py.File(l1b_path, "r") as l1b, h5py.File(l2a_path, "r") as l2a:
         # CLI loop to query shot numbers and plot corresponding waveforms
         while True:
@@ -123,6 +123,7 @@ def cli(l1b_path, l2a_path, config):
 
                     # Plot the waveform
                     plotter.plot(waveform)
+                    plotter.show()
 
                 except (ValueError, IndexError):
                     click.echo(